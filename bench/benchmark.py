@@ -0,0 +1,877 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线基准测试 / 回归检测
+
+覆盖两个脚本的热点路径，全程不访问外网:
+  cf_parse      parse_cloudflare_table 解析 uouin 页面（保存的样本 + 生成的大页面）
+  cf_records    HuaWeiApi.set_records 差异比对与更新（本地 DnsClient 桩）
+  cf_scan       scan_cloudflare_ips 漏斗扫描（本地假 trace 响应端 + 全量官方段纯函数探测）
+  cf_vantage    vantage_best 经本地隧道桩代理测 IP × 节点延迟矩阵并按线路挑选
+  notify        TelegramNotifier 入队耗时、合并与送达耗时（本地 Bot API 桩）
+  proxy_parse   parse_proxy_table 解析代理列表页面（保存的样本 + 生成的大页面）
+  proxy_check   check_all_proxies 检测本地 SOCKS5/HTTP 桩代理（可配置失效/慢速比例）
+
+用法:
+  python bench/benchmark.py                       # 运行并与 bench/baseline.json 对比
+  python bench/benchmark.py --save-baseline       # 运行并保存为新基线
+  python bench/benchmark.py --cases proxy_check --dead-ratio 0.5 --threshold 0.3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import selectors
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+BENCH_DIR   = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR    = os.path.dirname(BENCH_DIR)
+FIXTURE_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 's5'))
+
+# 回归判定: 指标名 → 数值越大越好(True) / 越小越好(False)
+HIGHER_IS_BETTER = {
+    'throughput': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'peak_kb': False,
+}
+
+# 回归判定的绝对下限: 变化量不超过该值时不计为回归（亚毫秒级延迟的相对抖动很大）
+ABSOLUTE_FLOOR_ARGS = {
+    'p50_ms': 'min_delta_ms',
+    'p95_ms': 'min_delta_ms',
+    'peak_kb': 'min_delta_kb',
+}
+
+
+# ──────────────────────────────────────────────────────────────
+# 统计工具
+# ──────────────────────────────────────────────────────────────
+
+def percentile(samples, pct):
+    """线性插值百分位"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    pos = (len(ordered) - 1) * pct / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(samples, items, elapsed, peak_bytes, **extra):
+    """samples 为单次耗时（秒），items 为 elapsed 内处理的条目数"""
+    result = {
+        'throughput': round(items / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'peak_kb': round(peak_bytes / 1024, 1),
+    }
+    result.update(extra)
+    return result
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测函数的逐行打印"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def peak_memory(fn):
+    """单独跑一次测峰值内存（tracemalloc 会拖慢计时，不与计时混跑）"""
+    tracemalloc.start()
+    try:
+        with quiet():
+            fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def time_iterations(fn, iterations, items_per_call):
+    samples = []
+    with quiet():
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    return summarize(samples, items_per_call * iterations, sum(samples), peak_memory(fn))
+
+
+# ──────────────────────────────────────────────────────────────
+# 页面生成
+# ──────────────────────────────────────────────────────────────
+
+def make_uouin_page(rows, seed=0, ipv6_ratio=0.2, loss_ratio=0.1):
+    """生成与 api.uouin.com/cloudflare.html 结构一致的表格页面（9 列）"""
+    rng = random.Random(seed)
+    lines = ['电信', '联通', '移动', '多线']
+    out = ['<html><body><table class="table table-striped">',
+           '<tr><th>#</th><th>线路</th><th>优选地址</th><th>丢包</th><th>延迟</th>'
+           '<th>速度</th><th>带宽</th><th>Colo</th><th>时间</th></tr>']
+    for i in range(rows):
+        if rng.random() < ipv6_ratio:
+            line = 'IPV6'
+            ip = f"2606:4700:{rng.randrange(0x10000):x}::{rng.randrange(0x10000):x}"
+        else:
+            line = rng.choice(lines)
+            ip = f"{rng.choice(['104.16', '104.18', '172.64', '172.67'])}.{rng.randrange(256)}.{rng.randrange(256)}"
+        loss = '0.00%' if rng.random() >= loss_ratio else f"{rng.uniform(1, 30):.2f}%"
+        out.append(
+            f"<tr><td>{i + 1}</td><td>{line}</td><td>{ip}</td><td>{loss}</td>"
+            f"<td>{rng.uniform(30, 300):.2f}ms</td><td>{rng.uniform(5, 90):.2f}mb/s</td>"
+            f"<td>{rng.uniform(50, 800):.2f}mb</td><td>HKG</td><td>2026/08/22 21:22:27</td></tr>")
+    out.append('</table></body></html>')
+    return '\n'.join(out)
+
+
+def make_proxy_page(rows, seed=0, masked_ratio=0.2):
+    """生成与 proxy-socks5.com/proxy_list 结构一致的表格页面（4 列）"""
+    rng = random.Random(seed)
+    out = ['<html><body><table>',
+           '<tr><th>类型</th><th>IP</th><th>端口</th><th>地理信息</th></tr>']
+    for _ in range(rows):
+        protocol = rng.choice(['socks5', 'http', 'https'])
+        octets = [str(rng.randrange(1, 255)) for _ in range(4)]
+        if rng.random() < masked_ratio:
+            octets[2] = 'X'
+        ip = '.'.join(octets)
+        port = rng.choice(['1080', '8080', '3128', '443'])
+        tag = ('<span class="residential-tag">家宽</span>' if rng.random() < 0.3
+               else '<span class="datacenter-tag">机房</span>')
+        out.append(
+            f'<tr><td><span class="badge">{protocol}</span></td>'
+            f'<td><strong class="d-sm-none">{protocol} </strong>{ip}<span>:{port}</span></td>'
+            f'<td>{port}</td>'
+            f'<td><span>{tag}<span class="flex-text">法国 法兰西岛大区 巴黎 — 亚马逊云 Aws</span></span>'
+            f'<span class="text-muted">入库:08-22 15:44</span></td></tr>')
+    out.append('</table></body></html>')
+    return '\n'.join(out)
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+# ──────────────────────────────────────────────────────────────
+# 华为云 DnsClient 桩
+# ──────────────────────────────────────────────────────────────
+
+class StubDnsClient:
+    """只实现 HuaWeiApi 用到的 4 个方法，记录调用次数"""
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.recordsets = []
+        self.calls = {'list': 0, 'update': 0, 'create': 0}
+
+    def list_public_zones(self, req):
+        return SimpleNamespace(zones=[SimpleNamespace(name=f"{self.domain}.", id='zone-1')])
+
+    def list_record_sets_with_line(self, req):
+        self.calls['list'] += 1
+        return SimpleNamespace(recordsets=[r for r in self.recordsets if r.type == req.type])
+
+    def update_record_set(self, req):
+        self.calls['update'] += 1
+        for r in self.recordsets:
+            if r.id == req.recordset_id:
+                r.records = list(req.body.records)
+
+    def create_record_set(self, req):
+        self.calls['create'] += 1
+        body = req.body
+        self.recordsets.append(SimpleNamespace(
+            id=f"rs-{len(self.recordsets)}", name=body['name'], type=body['type'],
+            line=body['line'], records=list(body['records'])))
+
+
+# ──────────────────────────────────────────────────────────────
+# 本地 SOCKS5 / HTTP 桩代理
+# ──────────────────────────────────────────────────────────────
+
+class StubProxyFarm:
+    """
+    在 127.1x.x.y 回环地址上批量监听桩代理，按 /24 分块
+
+      失效块  → 端口监听但从不 accept / 应答（黑洞），每次检测都要等满超时，模拟整段机房下线
+      慢速    → 握手后延迟 slow_delay 秒再响应
+      其余    → 立即返回 200
+
+    SOCKS5 桩完成握手后直接充当目标 HTTP 服务器，不会真的向外连接。
+    传入 tunnel_delay(代理ip, 目标ip) 时改为真实隧道（SOCKS5 CONNECT / HTTP CONNECT），
+    延迟返回值秒数后连接目标并双向转发，用于模拟不同节点到目标的网络距离
+    """
+
+    def __init__(self, count, block_size=4, dead_ratio=0.3, slow_ratio=0.1,
+                 slow_delay=0.5, seed=0, tunnel_delay=None, locations=None):
+        self.count = count
+        self.block_size = block_size
+        self.dead_ratio = dead_ratio
+        self.slow_ratio = slow_ratio
+        self.slow_delay = slow_delay
+        self.tunnel_delay = tunnel_delay
+        self.locations = locations
+        self.rng = random.Random(seed)
+        self.selector = selectors.DefaultSelector()
+        self.listeners = []
+        self.blackholes = []
+        self.proxies = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        blocks = (self.count + self.block_size - 1) // self.block_size
+        for b in range(blocks):
+            block_dead = self.rng.random() < self.dead_ratio
+            for n in range(min(self.block_size, self.count - b * self.block_size)):
+                ip = f"127.{10 + b // 250}.{b % 250}.{n + 1}"
+                protocol = 'socks5' if b % 2 == 0 else 'http'
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind((ip, 0))
+                port = sock.getsockname()[1]
+                sock.listen(64)
+                if block_dead:
+                    self.blackholes.append(sock)
+                else:
+                    sock.setblocking(False)
+                    slow = self.rng.random() < self.slow_ratio
+                    self.selector.register(sock, selectors.EVENT_READ, slow)
+                    self.listeners.append(sock)
+                self.proxies.append({
+                    'protocol': protocol, 'ip': ip, 'port': str(port),
+                    'timestamp': '',
+                    'location': (self.locations[len(self.proxies) % len(self.locations)]
+                                 if self.locations else f"桩 {ip.rsplit('.', 1)[0]}"),
+                    'is_residential': False,
+                })
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        for sock in self.listeners + self.blackholes:
+            sock.close()
+        self.selector.close()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            for key, _ in self.selector.select(timeout=0.1):
+                try:
+                    conn, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                threading.Thread(target=self._handle, args=(conn, key.data), daemon=True).start()
+
+    def _handle(self, conn, slow):
+        conn.setblocking(True)
+        conn.settimeout(10)
+        if self.tunnel_delay:
+            return self._tunnel(conn)
+        try:
+            first = conn.recv(1)
+            if first == b'\x05':
+                nmethods = conn.recv(1)[0]
+                conn.recv(nmethods)
+                conn.sendall(b'\x05\x00')
+                head = conn.recv(4)
+                atyp = head[3]
+                if atyp == 1:
+                    conn.recv(4 + 2)
+                elif atyp == 3:
+                    conn.recv(conn.recv(1)[0] + 2)
+                else:
+                    conn.recv(16 + 2)
+                conn.sendall(b'\x05\x00\x00\x01\x00\x00\x00\x00\x00\x00')
+                request = b''
+            else:
+                request = first
+            while b'\r\n\r\n' not in request:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                request += chunk
+            if slow:
+                time.sleep(self.slow_delay)
+            body = b'{"origin": "127.0.0.1"}'
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: ' + str(len(body)).encode() +
+                         b'\r\nConnection: close\r\n\r\n' + body)
+        except (OSError, IndexError):
+            pass
+        finally:
+            conn.close()
+
+    def _tunnel(self, conn):
+        upstream = None
+        try:
+            first = conn.recv(1)
+            if first == b'\x05':
+                nmethods = conn.recv(1)[0]
+                conn.recv(nmethods)
+                conn.sendall(b'\x05\x00')
+                head = conn.recv(4)
+                if head[3] != 1:
+                    return
+                target = socket.inet_ntoa(conn.recv(4))
+                port = int.from_bytes(conn.recv(2), 'big')
+                reply = b'\x05\x00\x00\x01\x00\x00\x00\x00\x00\x00'
+            else:
+                request = first
+                while b'\r\n\r\n' not in request:
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        return
+                    request += chunk
+                target, port = request.split(b' ')[1].decode().rsplit(':', 1)
+                port = int(port)
+                reply = b'HTTP/1.1 200 Connection established\r\n\r\n'
+            time.sleep(self.tunnel_delay(conn.getsockname()[0], target))
+            upstream = socket.create_connection((target, port), timeout=10)
+            conn.sendall(reply)
+            threading.Thread(target=_pipe, args=(upstream, conn), daemon=True).start()
+            _pipe(conn, upstream)
+        except (OSError, IndexError, ValueError):
+            pass
+        finally:
+            conn.close()
+            if upstream:
+                upstream.close()
+
+
+def _pipe(src, dst):
+    """单向转发直到任一端关闭"""
+    try:
+        while True:
+            data = src.recv(65536)
+            if not data:
+                break
+            dst.sendall(data)
+    except OSError:
+        pass
+    finally:
+        try:
+            dst.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+class StubTargets:
+    """在 127.30.0.x 上监听同一端口的桩目标，只接受连接，等对端关闭"""
+
+    def __init__(self, count):
+        self.ips = [f"127.30.0.{i + 1}" for i in range(count)]
+        self.listeners = []
+        self.port = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        for ip in self.ips:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((ip, self.port))
+            self.port = sock.getsockname()[1]
+            sock.listen(256)
+            sock.settimeout(0.1)
+            self.listeners.append(sock)
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        for sock in self.listeners:
+            sock.close()
+
+    def _serve(self, sock):
+        while not self._stop.is_set():
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                continue
+            threading.Thread(target=_pipe, args=(conn, conn), daemon=True).start()
+
+
+# ──────────────────────────────────────────────────────────────
+# 基准用例
+# ──────────────────────────────────────────────────────────────
+
+def bench_cf_parse(args):
+    from cloudflare_dns_updater import parse_cloudflare_table
+
+    results = {}
+    pages = {
+        'fixture': load_fixture('uouin_cloudflare.html'),
+        'generated': make_uouin_page(args.rows),
+    }
+    for name, page in pages.items():
+        rows = page.count('<tr>') - 1
+        results[f"cf_parse.{name}"] = time_iterations(
+            lambda: parse_cloudflare_table(page), args.iterations, rows)
+    return results
+
+
+def bench_cf_records(args):
+    from cloudflare_dns_updater import HuaWeiApi, MAX_IP_PER_LINE
+
+    domain = 'cdn.example.com'
+    rng = random.Random(0)
+    ip_sets = [[f"104.18.{rng.randrange(256)}.{rng.randrange(256)}" for _ in range(MAX_IP_PER_LINE)]
+               for _ in range(4)]
+    lines = ['默认', '电信', '联通', '移动']
+
+    def make_api():
+        api = HuaWeiApi.__new__(HuaWeiApi)
+        api.client = StubDnsClient(domain)
+        api.zone_id = api._get_zones()
+        return api
+
+    results = {}
+    # unchanged: 记录已存在且一致（最常见的每小时运行）
+    # changed:   记录已存在但 IP 轮换，需要 update
+    for scenario in ('unchanged', 'changed'):
+        api = make_api()
+        with quiet():
+            for line, ips in zip(lines, ip_sets):
+                api.set_records(domain, ips, line=line)
+        state = {'flip': 0}
+
+        def run(api=api, scenario=scenario):
+            if scenario == 'changed':
+                state['flip'] += 1
+            for i, line in enumerate(lines):
+                ips = ip_sets[(i + state['flip']) % len(ip_sets)]
+                api.set_records(domain, ips, line=line)
+
+        result = time_iterations(run, args.iterations, len(lines))
+        result['dns_calls'] = dict(api.client.calls)
+        results[f"cf_records.{scenario}"] = result
+    return results
+
+
+def bench_proxy_parse(args):
+    from generate_proxy_list import ProxyListScraper
+
+    scraper = ProxyListScraper()
+    results = {}
+    pages = {
+        'fixture': load_fixture('proxy_list.html'),
+        'generated': make_proxy_page(args.rows),
+    }
+    for name, page in pages.items():
+        rows = page.count('<tr>') - 1
+        results[f"proxy_parse.{name}"] = time_iterations(
+            lambda: scraper.parse_proxy_table(page), args.iterations, rows)
+    return results
+
+
+def bench_proxy_check(args):
+    from generate_proxy_list import ProxyListScraper
+
+    results = {}
+    with StubProxyFarm(args.proxies, block_size=args.block_size, dead_ratio=args.dead_ratio,
+                       slow_ratio=args.slow_ratio, slow_delay=args.slow_delay) as farm:
+        for rule in args.sibling_rules.split(','):
+            scraper = ProxyListScraper()
+            scraper.check_url = 'http://127.0.0.1:9/ip'
+            scraper.check_timeout = args.check_timeout
+            scraper.deferred_timeout = args.deferred_timeout
+            scraper.sibling_rule = rule
+
+            samples = []
+            check = scraper.check_proxy_availability
+
+            def timed_check(proxy_info, timeout=10, check=check, samples=samples):
+                start = time.perf_counter()
+                ok = check(proxy_info, timeout=timeout)
+                samples.append(time.perf_counter() - start)
+                return ok
+
+            scraper.check_proxy_availability = timed_check
+            start = time.perf_counter()
+            with quiet():
+                alive = scraper.check_all_proxies(farm.proxies, max_workers=args.workers)
+            elapsed = time.perf_counter() - start
+            stats = scraper.check_stats
+            # 峰值内存单独跑一次，不计入延迟样本
+            scraper.check_proxy_availability = check
+            peak = peak_memory(lambda: scraper.check_all_proxies(farm.proxies, max_workers=args.workers))
+            results[f"proxy_check.{rule}"] = summarize(
+                samples, len(farm.proxies), elapsed, peak,
+                wall_s=round(elapsed, 3), alive=len(alive),
+                checks=stats.get('checks'),
+                checks_saved=stats.get('saved_checks'))
+    return results
+
+
+class FakeTraceResponder:
+    """
+    本地假 /cdn-cgi/trace 响应端，按 Host 头里的目标 IP 所在 /24 决定行为:
+    约 dead_ratio 比例的前缀直接断开，其余延迟 0~max_delay 秒后返回 200
+    """
+
+    def __init__(self, dead_ratio=0.2, max_delay=0.02):
+        self.dead_ratio = dead_ratio
+        self.max_delay = max_delay
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.sock.listen(256)
+        self.sock.settimeout(0.1)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.sock.close()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        conn.settimeout(5)
+        try:
+            request = b''
+            while b'\r\n\r\n' not in request:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                request += chunk
+            host = re.search(rb'Host: ([^\r]+)', request).group(1).decode()
+            weight = random.Random(host.rsplit('.', 1)[0]).random()
+            if weight < self.dead_ratio:
+                return
+            time.sleep(self.max_delay * weight)
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        except (OSError, AttributeError):
+            pass
+        finally:
+            conn.close()
+
+
+def bench_cf_scan(args):
+    from cloudflare_scanner import scan_cloudflare_ips, http_trace_probe
+
+    results = {}
+
+    def run_scan(name, probe, **kwargs):
+        samples = []
+
+        def timed_probe(ip):
+            start = time.perf_counter()
+            latency = probe(ip)
+            samples.append(time.perf_counter() - start)
+            return latency
+
+        start = time.perf_counter()
+        with quiet():
+            full, best = scan_cloudflare_ips(probe=timed_probe, seed=0, **kwargs)
+        elapsed = time.perf_counter() - start
+        peak = peak_memory(lambda: scan_cloudflare_ips(probe=probe, seed=0, **kwargs))
+        results[f"cf_scan.{name}"] = summarize(
+            samples, len(samples), elapsed, peak, wall_s=round(elapsed, 3),
+            ipv4=len(best.get('默认', [])), ipv6=len(best.get('IPv6', [])))
+
+    # 本地假响应端: 真实 http_trace_probe 走 socket，目标 IP 通过 Host 头传给响应端
+    with FakeTraceResponder(dead_ratio=args.dead_ratio) as responder:
+        run_scan('local',
+                 lambda ip: http_trace_probe('127.0.0.1', port=responder.port, timeout=1, host=ip),
+                 ipv4_cidrs=args.scan_cidrs.split(','), ipv6_cidrs=[])
+
+    # 全量官方段 + 纯函数探测: 检验百万级地址下的内存上限
+    def synthetic_probe(ip):
+        weight = random.Random(ip.rsplit('.', 1)[0] if '.' in ip else ip[:14]).random()
+        return None if weight < args.dead_ratio else weight
+
+    run_scan('synthetic', synthetic_probe, v6_prefixes=1024)
+    return results
+
+
+def bench_cf_vantage(args):
+    from cloudflare_vantage import load_vantages, probe_via_proxy, vantage_best
+
+    lines = ['电信', '联通', '移动']
+    locations = [f"[机房] 中国 江苏 南京 {line}" for line in lines]
+
+    # 节点 i 位于 127.10.i.1，运营商为 lines[i % 3]；目标到各运营商的模拟延迟固定随机
+    def distance(proxy_ip, target_ip):
+        line = lines[int(proxy_ip.split('.')[2]) % len(lines)]
+        rng = random.Random(f"{target_ip}-{line}")
+        return args.max_delay * rng.random()
+
+    def truth(line, targets, k):
+        return set(sorted(targets, key=lambda t: random.Random(f"{t}-{line}").random())[:k])
+
+    results = {}
+    with StubTargets(args.targets) as targets, \
+            StubProxyFarm(args.vantages, block_size=1, dead_ratio=0, slow_ratio=0,
+                          tunnel_delay=distance, locations=locations) as farm:
+        # 按 alive.json 格式落盘再读回，覆盖运营商识别
+        with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8', delete=False) as f:
+            json.dump(farm.proxies, f, ensure_ascii=False)
+        try:
+            vantages = load_vantages(f.name)
+        finally:
+            os.remove(f.name)
+
+        best = {'默认': list(targets.ips)}
+        keep = max(1, args.targets // 4)
+        samples = []
+
+        def timed_probe(vantage, ip):
+            start = time.perf_counter()
+            r = probe_via_proxy(vantage, ip, port=targets.port, timeout=5, sni=None)
+            samples.append(time.perf_counter() - start)
+            return r
+
+        start = time.perf_counter()
+        with quiet():
+            _, chosen = vantage_best(best, vantages, probe=timed_probe, keep=keep, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        # 峰值内存单独跑一次，不计入延迟样本
+        peak = peak_memory(lambda: vantage_best(
+            best, vantages, keep=keep, workers=args.workers,
+            probe=lambda v, ip: probe_via_proxy(v, ip, port=targets.port, timeout=5, sni=None)))
+
+        # 各运营商线路选出的 IP 与真实最快 IP 的重合率
+        hits = [len(set(chosen.get(line, [])) & truth(line, targets.ips, keep)) / keep for line in lines]
+        results['cf_vantage.matrix'] = summarize(
+            samples, len(targets.ips) * len(vantages), elapsed, peak,
+            wall_s=round(elapsed, 3), top_hit=round(sum(hits) / len(hits), 3))
+    return results
+
+
+class StubTelegramApi:
+    """本地 Telegram Bot API 桩: sendMessage 延迟 delay 秒后返回 ok，记录收到的消息"""
+
+    def __init__(self, delay=0.2):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        stub = self
+        self.delay = delay
+        self.messages = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.messages.append(json.loads(body))
+                time.sleep(stub.delay)
+                reply = b'{"ok": true, "result": {}}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_notify(args):
+    from telegram_notifier import TelegramNotifier
+
+    def run_once(api, samples):
+        notifier = TelegramNotifier('TOKEN', '1', api_base=api.url, min_interval=0.05)
+        for i in range(args.messages):
+            start = time.perf_counter()
+            notifier.send(f"<b>事件 {i}</b>")
+            samples.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        notifier.close()
+        return notifier, time.perf_counter() - start
+
+    with StubTelegramApi(delay=args.notify_delay) as api:
+        samples = []
+        with quiet():
+            notifier, flush = run_once(api, samples)
+        sent = len(api.messages)
+        peak = peak_memory(lambda: run_once(api, []))
+        delivered = notifier.metrics['latency_ms']
+        return {'notify.enqueue': summarize(
+            samples, len(samples), sum(samples), peak,
+            flush_s=round(flush, 3), http_requests=sent,
+            coalesced=notifier.metrics['coalesced'],
+            delivery_p50_ms=round(percentile(delivered, 50), 1),
+            delivery_max_ms=round(max(delivered, default=0), 1))}
+
+
+CASES = {
+    'cf_parse': bench_cf_parse,
+    'cf_records': bench_cf_records,
+    'cf_scan': bench_cf_scan,
+    'cf_vantage': bench_cf_vantage,
+    'notify': bench_notify,
+    'proxy_parse': bench_proxy_parse,
+    'proxy_check': bench_proxy_check,
+}
+
+
+# ──────────────────────────────────────────────────────────────
+# 基线对比
+# ──────────────────────────────────────────────────────────────
+
+def run_case(case, args):
+    """运行 args.repeat 次，数值指标取中位数，降低线程调度带来的抖动"""
+    runs = [CASES[case](args) for _ in range(args.repeat)]
+    merged = {}
+    for name, metrics in runs[0].items():
+        merged[name] = {
+            key: (round(statistics.median(r[name][key] for r in runs), 3)
+                  if isinstance(value, (int, float)) else value)
+            for key, value in metrics.items()
+        }
+    return merged
+
+
+def compare(results, baseline, args):
+    """返回超出阈值的回归列表；基线中有而本次被跳过/缺失的用例同样计为失败"""
+    cases = args.cases.split(',')
+    regressions = []
+    for name, base in baseline.items():
+        case = name.split('.')[0]
+        if case not in cases:
+            continue
+        metrics = results.get(name)
+        if metrics is None:
+            reason = results.get(case, {}).get('skipped', '未产出结果')
+            regressions.append(f"{name}: 用例被跳过（{reason}）")
+            continue
+        for metric, higher_better in HIGHER_IS_BETTER.items():
+            old, new = base.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            floor = getattr(args, ABSOLUTE_FLOOR_ARGS.get(metric, ''), 0)
+            if abs(new - old) <= floor:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_better else change
+            if worse > args.threshold:
+                regressions.append(f"{name}.{metric}: {old} → {new} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线基准测试 / 回归检测')
+    parser.add_argument('--cases', default=','.join(CASES), help='逗号分隔的用例名')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=2000, help='生成页面的行数')
+    parser.add_argument('--proxies', type=int, default=200, help='桩代理数量')
+    parser.add_argument('--block-size', type=int, default=4, help='每个 /24 的桩代理数')
+    parser.add_argument('--dead-ratio', type=float, default=0.3, help='整段失效的 /24 比例')
+    parser.add_argument('--slow-ratio', type=float, default=0.1)
+    parser.add_argument('--slow-delay', type=float, default=0.5)
+    parser.add_argument('--check-timeout', type=float, default=2)
+    parser.add_argument('--deferred-timeout', type=float, default=0.6, help='defer 规则的短超时')
+    parser.add_argument('--workers', type=int, default=20)
+    parser.add_argument('--scan-cidrs', default='104.16.0.0/16', help='cf_scan 本地扫描的网段')
+    parser.add_argument('--targets', type=int, default=20, help='cf_vantage 桩目标数')
+    parser.add_argument('--vantages', type=int, default=9, help='cf_vantage 桩节点数')
+    parser.add_argument('--max-delay', type=float, default=0.05, help='cf_vantage 节点到目标的最大模拟延迟')
+    parser.add_argument('--messages', type=int, default=20, help='notify 单次运行的消息数')
+    parser.add_argument('--notify-delay', type=float, default=0.2, help='notify 桩 API 的响应延迟')
+    parser.add_argument('--sibling-rules', default='defer,skip,test', help='proxy_check 要对比的分组规则')
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25, help='允许的最大退化比例')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='延迟变化小于该值时不计为回归')
+    parser.add_argument('--min-delta-kb', type=float, default=64, help='峰值内存变化小于该值时不计为回归')
+    parser.add_argument('--repeat', type=int, default=3, help='每个用例重复次数，指标取中位数')
+    parser.add_argument('--output', help='结果另存为 JSON')
+    args = parser.parse_args()
+
+    results = {}
+    for case in args.cases.split(','):
+        print(f"▶ {case}")
+        try:
+            results.update(run_case(case, args))
+        except ImportError as e:
+            print(f"  ⏭️  缺少依赖，跳过: {e}")
+            results[case] = {'skipped': str(e)}
+
+    print(f"\n{'用例':<28}{'吞吐/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'峰值 KB':>10}")
+    for name, m in results.items():
+        if 'skipped' in m:
+            print(f"{name:<28}{'跳过':>12}")
+            continue
+        print(f"{name:<28}{m['throughput']:>12}{m['p50_ms']:>10}{m['p95_ms']:>10}"
+              f"{m['p99_ms']:>10}{m['peak_kb']:>10}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({k: v for k, v in results.items() if 'skipped' not in v},
+                      f, ensure_ascii=False, indent=4)
+        print(f"\n✅ 基线已保存到 {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️  未找到基线 {args.baseline}，使用 --save-baseline 生成")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args)
+    if regressions:
+        print(f"\n❌ 超出回归阈值 {args.threshold:.0%} 或用例被跳过:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print(f"\n✅ 无超出 {args.threshold:.0%} 的回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,11 @@
 import os
 import json
 import sys
-import requests
 import html
 from datetime import datetime, timezone, timedelta
 from requests_html import HTMLSession
 from bs4 import BeautifulSoup
+from telegram_notifier import TelegramNotifier
 from huaweicloudsdkcore.auth.credentials import BasicCredentials
 from huaweicloudsdkdns.v2 import DnsClient
 from huaweicloudsdkdns.v2.region.dns_region import DnsRegion
@@ -21,34 +21,22 @@ from huaweicloudsdkdns.v2.model import (
 
 MAX_IP_PER_LINE = 50
 
+_notifier = None
+
+
 def send_telegram(message):
     """
-    发送 Telegram 通知
+    发送 Telegram 通知（后台发送，进程退出前限时发完）
+
+    返回 True 只表示已入队，不代表已送达；送达结果在进程退出前打印
     """
-    bot_token = os.environ.get("TG_BOT_TOKEN")
-    user_id = os.environ.get("TG_USER_ID")
-    
-    if not bot_token or not user_id:
+    global _notifier
+    if _notifier is None:
+        _notifier = TelegramNotifier.from_env()
+    if _notifier is None:
         print("⚠️ TG_BOT_TOKEN 或 TG_USER_ID 未设置，跳过通知")
         return False
-    
-    try:
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        data = {
-            "chat_id": user_id,
-            "text": message,
-            "parse_mode": "HTML"
-        }
-        response = requests.post(url, json=data, timeout=10)
-        if response.status_code == 200:
-            print("✅ Telegram 通知发送成功")
-            return True
-        else:
-            print(f"❌ Telegram 通知发送失败: {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Telegram 通知异常: {str(e)}")
-        return False
+    return _notifier.send(message)
 
 
 class HuaWeiApi:
@@ -149,7 +137,14 @@ def fetch_cloudflare_ips():
     r = session.get(url, timeout=20)
     r.html.render(sleep=6, timeout=20)
 
-    soup = BeautifulSoup(r.html.html, "html.parser")
+    return parse_cloudflare_table(r.html.html)
+
+
+def parse_cloudflare_table(html_content):
+    """
+    解析 uouin 页面表格，返回 (完整数据, 最优IP)
+    """
+    soup = BeautifulSoup(html_content, "html.parser")
     table = soup.find("table", {"class": "table-striped"})
     best = {"默认": [], "电信": [], "联通": [], "移动": [], "IPv6": []}
     full = {}
@@ -188,6 +183,68 @@ def fetch_cloudflare_ips():
     return full, best
 
 
+def merge_best(best, extra):
+    """
+    把自主扫描结果追加到同一线路之后（去重 + 限制数量）
+    """
+    for line, ips in extra.items():
+        best[line] = list(dict.fromkeys(best.get(line, []) + ips))[:MAX_IP_PER_LINE]
+    return best
+
+
+def scan_from_env():
+    """
+    按环境变量运行 Cloudflare 段扫描，CF_SCAN 未开启时返回空结果
+    """
+    if os.environ.get("CF_SCAN", "0") != "1":
+        return {}, {}
+
+    # 依赖 numpy，仅在开启扫描时导入
+    from cloudflare_scanner import scan_cloudflare_ips
+
+    def cidrs(name):
+        value = os.environ.get(name)
+        return [c.strip() for c in value.split(",") if c.strip()] if value else None
+
+    return scan_cloudflare_ips(
+        ipv4_cidrs=cidrs("CF_SCAN_IPV4_CIDRS"),
+        ipv6_cidrs=cidrs("CF_SCAN_IPV6_CIDRS"),
+        port=int(os.environ.get("CF_SCAN_PORT", "80")),
+        timeout=float(os.environ.get("CF_SCAN_TIMEOUT", "1")),
+        top_prefixes=int(os.environ.get("CF_SCAN_TOP_PREFIXES", "32")),
+        dense=int(os.environ.get("CF_SCAN_DENSE", "16")),
+        keep=MAX_IP_PER_LINE,
+    )
+
+
+def vantage_from_env(best):
+    """
+    按环境变量经 s5/alive.json 中的代理多点测速，CF_VANTAGE 未开启时返回空结果
+    """
+    if os.environ.get("CF_VANTAGE", "0") != "1":
+        return {}, {}
+
+    # 依赖 PySocks，仅在开启多点测速时导入
+    from cloudflare_vantage import load_vantages, probe_via_proxy, vantage_best
+
+    path = os.environ.get("CF_VANTAGE_FILE",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "s5", "alive.json"))
+    if not os.path.exists(path):
+        print(f"⚠️ 未找到测速节点文件 {path}，跳过多点测速")
+        return {}, {}
+
+    port = int(os.environ.get("CF_VANTAGE_PORT", "443"))
+    timeout = float(os.environ.get("CF_VANTAGE_TIMEOUT", "5"))
+    sni = os.environ.get("CF_VANTAGE_SNI", "cloudflare.com")
+    return vantage_best(
+        best,
+        load_vantages(path),
+        probe=lambda v, ip: probe_via_proxy(v, ip, port=port, timeout=timeout, sni=sni),
+        keep=MAX_IP_PER_LINE,
+        min_survivors=int(os.environ.get("CF_VANTAGE_MIN_IPS", "5")),
+    )
+
+
 if __name__ == "__main__":
     full_domain = os.environ.get("FULL_DOMAIN")
     ak = os.environ.get("HUAWEI_ACCESS_KEY")
@@ -220,6 +277,16 @@ if __name__ == "__main__":
         
         # 获取 Cloudflare IP
         full_data, best_ips = fetch_cloudflare_ips()
+
+        # 自主扫描（CF_SCAN=1 时）结果追加到对应线路
+        scan_full, scan_best = scan_from_env()
+        full_data.update(scan_full)
+        merge_best(best_ips, scan_best)
+
+        # 多点测速（CF_VANTAGE=1 时）按运营商节点实测结果重新挑选 电信/联通/移动
+        vantage_full, vantage_lines = vantage_from_env(best_ips)
+        full_data.update(vantage_full)
+        best_ips.update(vantage_lines)
         
         # 统计更新信息
         update_summary = []
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cloudflare IP 段自主扫描
+
+从 Cloudflare 官方 IPv4 / IPv6 段出发，用 NumPy 数组批量生成候选地址
+（不为每个地址创建 Python 对象），按漏斗逐级筛选:
+
+  阶段1 稀疏采样  每个 /24（IPv6 为 /48）抽 sparse 个地址探测，只保留最快的 top_prefixes 个前缀
+  阶段2 加密采样  在这些前缀内各抽 dense 个地址探测，只保留最快的 keep 个地址
+  阶段3 复测确认  对保留地址复测 rounds 次，取中位数排序
+
+阶段1 按 chunk 个前缀分批生成、探测、丢弃，内存只与 chunk 和 top_prefixes 有关，
+与扫描的地址总数无关。结果与 fetch_cloudflare_ips 返回相同的 (完整数据, 最优IP) 结构。
+"""
+
+import heapq
+import ipaddress
+import socket
+import statistics
+import time
+import concurrent.futures
+
+import numpy as np
+
+# https://www.cloudflare.com/ips/
+CF_IPV4_CIDRS = [
+    "173.245.48.0/20", "103.21.244.0/22", "103.22.200.0/22", "103.31.4.0/22",
+    "141.101.64.0/18", "108.162.192.0/18", "190.93.240.0/20", "188.114.96.0/20",
+    "197.234.240.0/22", "198.41.128.0/17", "162.158.0.0/15", "104.16.0.0/13",
+    "104.24.0.0/14", "172.64.0.0/13", "131.0.72.0/22",
+]
+CF_IPV6_CIDRS = [
+    "2400:cb00::/32", "2606:4700::/32", "2803:f800::/32", "2405:b500::/32",
+    "2405:8100::/32", "2a06:98c0::/29", "2c0f:f248::/32",
+]
+
+
+class _IPv4Space:
+    """IPv4: 前缀键为地址高 24 位（uint32），每个 /24 全部参与阶段1"""
+
+    dtype = np.uint32
+
+    def __init__(self, cidrs):
+        self.networks = [ipaddress.IPv4Network(c, strict=False) for c in cidrs]
+        for net in self.networks:
+            if net.prefixlen > 24:
+                raise ValueError(f"IPv4 段 {net} 小于 /24，无法按 /24 采样")
+
+    def prefix_chunks(self, chunk, rng):
+        for net in self.networks:
+            first = int(net.network_address) >> 8
+            count = 1 << (24 - net.prefixlen)
+            for start in range(0, count, chunk):
+                yield np.arange(first + start, first + min(count, start + chunk), dtype=np.uint32)
+
+    def sample(self, prefixes, per_prefix, rng):
+        """返回 (前缀键数组, 地址字符串列表)，主机位避开 .0 / .255，同一前缀内不重复"""
+        per_prefix = min(per_prefix, 254)
+        if per_prefix == 1:
+            hosts = rng.integers(1, 255, size=(len(prefixes), 1), dtype=np.uint32)
+        else:
+            # 每行对 1..254 随机排序取前 per_prefix 个，即无放回抽样
+            order = np.argpartition(rng.random((len(prefixes), 254)), per_prefix - 1, axis=1)
+            hosts = (order[:, :per_prefix] + 1).astype(np.uint32)
+        addrs = ((prefixes[:, None].astype(np.uint32) << np.uint32(8)) | hosts).ravel()
+        packed = addrs.astype('>u4').tobytes()
+        ips = [socket.inet_ntoa(packed[i:i + 4]) for i in range(0, len(packed), 4)]
+        return np.repeat(prefixes, per_prefix), ips
+
+
+class _IPv6Space:
+    """IPv6: 前缀键为地址高 48 位（uint64），每段随机抽 v6_prefixes 个 /48 参与阶段1"""
+
+    dtype = np.uint64
+
+    def __init__(self, cidrs, v6_prefixes):
+        self.networks = [ipaddress.IPv6Network(c, strict=False) for c in cidrs]
+        for net in self.networks:
+            if net.prefixlen > 48:
+                raise ValueError(f"IPv6 段 {net} 小于 /48，无法按 /48 采样")
+        self.v6_prefixes = v6_prefixes
+
+    def prefix_chunks(self, chunk, rng):
+        for net in self.networks:
+            first = int(net.network_address) >> 80
+            count = 1 << (48 - net.prefixlen)
+            picks = np.unique(rng.integers(0, count, size=min(count, self.v6_prefixes), dtype=np.uint64))
+            for start in range(0, len(picks), chunk):
+                yield np.uint64(first) + picks[start:start + chunk]
+
+    def sample(self, prefixes, per_prefix, rng):
+        n = len(prefixes) * per_prefix
+        keys = np.repeat(prefixes.astype(np.uint64), per_prefix)
+        hi = (keys << np.uint64(16)) | rng.integers(0, 1 << 16, size=n, dtype=np.uint64)
+        lo = rng.integers(0, np.iinfo(np.uint64).max, size=n, dtype=np.uint64, endpoint=True)
+        packed = np.column_stack([hi, lo]).astype('>u8').tobytes()
+        ips = [socket.inet_ntop(socket.AF_INET6, packed[i:i + 16]) for i in range(0, len(packed), 16)]
+        return keys, ips
+
+
+def http_trace_probe(ip, port=80, timeout=1.0, host="cloudflare.com"):
+    """
+    探测单个 IP: TCP 建连 + GET /cdn-cgi/trace 首字节耗时（秒），失败返回 None
+    """
+    family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+    start = time.perf_counter()
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect((ip, port))
+            sock.sendall(f"GET /cdn-cgi/trace HTTP/1.1\r\nHost: {host}\r\n"
+                         f"Connection: close\r\n\r\n".encode())
+            if not sock.recv(16).startswith(b"HTTP/"):
+                return None
+        return time.perf_counter() - start
+    except OSError:
+        return None
+
+
+def _push_top(heap, size, latency, item):
+    """维护最快的 size 个结果（大顶堆，存负延迟）"""
+    if len(heap) < size:
+        heapq.heappush(heap, (-latency, item))
+    elif latency < -heap[0][0]:
+        heapq.heapreplace(heap, (-latency, item))
+
+
+def _funnel(space, probe, executor, rng, sparse, top_prefixes, dense, keep, rounds, chunk, stats):
+    # 阶段1: 稀疏采样，只保留最快的前缀
+    top = []
+    for prefixes in space.prefix_chunks(chunk, rng):
+        keys, ips = space.sample(prefixes, sparse, rng)
+        best_by_key = {}
+        for key, latency in zip(keys.tolist(), executor.map(probe, ips)):
+            stats["probes"] += 1
+            if latency is not None and latency < best_by_key.get(key, float("inf")):
+                best_by_key[key] = latency
+        stats["prefixes"] += len(prefixes)
+        stats["alive_prefixes"] += len(best_by_key)
+        for key, latency in best_by_key.items():
+            _push_top(top, top_prefixes, latency, key)
+
+    if not top:
+        return []
+
+    # 阶段2: 在最快前缀内加密采样
+    prefixes = np.array(sorted(key for _, key in top), dtype=space.dtype)
+    _, ips = space.sample(prefixes, dense, rng)
+    # IPv6 低 80 位随机，理论上仍可能重复，去重后再探测
+    ips = list(dict.fromkeys(ips))
+    finalists = []
+    for ip, latency in zip(ips, executor.map(probe, ips)):
+        stats["probes"] += 1
+        if latency is not None:
+            _push_top(finalists, keep, latency, ip)
+
+    # 阶段3: 复测取中位数，过半失败的剔除
+    results = []
+    ips = [ip for _, ip in finalists]
+    samples = {ip: [] for ip in ips}
+    for _ in range(rounds):
+        for ip, latency in zip(ips, executor.map(probe, ips)):
+            stats["probes"] += 1
+            if latency is not None:
+                samples[ip].append(latency)
+    for ip in ips:
+        if len(samples[ip]) * 2 > rounds:
+            results.append((ip, statistics.median(samples[ip])))
+    return sorted(results, key=lambda r: r[1])
+
+
+def scan_cloudflare_ips(ipv4_cidrs=None, ipv6_cidrs=None, port=80, timeout=1.0,
+                        sparse=1, top_prefixes=32, dense=16, keep=50, rounds=3,
+                        v6_prefixes=4096, chunk=4096, workers=64, probe=None, seed=None):
+    """
+    扫描 Cloudflare 段，返回 (完整数据, 最优IP)
+
+    probe(ip) 返回延迟秒数或 None，默认使用 http_trace_probe，可替换为本地假响应端
+    """
+    ipv4_cidrs = CF_IPV4_CIDRS if ipv4_cidrs is None else ipv4_cidrs
+    ipv6_cidrs = CF_IPV6_CIDRS if ipv6_cidrs is None else ipv6_cidrs
+    if probe is None:
+        probe = lambda ip: http_trace_probe(ip, port=port, timeout=timeout)
+
+    rng = np.random.default_rng(seed)
+    spaces = {"IPv4": _IPv4Space(ipv4_cidrs), "IPv6": _IPv6Space(ipv6_cidrs, v6_prefixes)}
+    full = {}
+    best = {"默认": [], "IPv6": []}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for name, space in spaces.items():
+            if not space.networks:
+                continue
+            stats = {"prefixes": 0, "alive_prefixes": 0, "probes": 0}
+            start = time.time()
+            results = _funnel(space, probe, executor, rng, sparse, top_prefixes,
+                              dense, keep, rounds, chunk, stats)
+            print(f"扫描 {name}: {stats['prefixes']} 个前缀，{stats['alive_prefixes']} 个有响应，"
+                  f"探测 {stats['probes']} 次，保留 {len(results)} 个 IP，"
+                  f"耗时 {time.time() - start:.1f}s")
+
+            full[f"扫描{name}"] = [{"IP": ip, "延迟": f"{latency * 1000:.2f}ms"} for ip, latency in results]
+            best["默认" if name == "IPv4" else "IPv6"] = [ip for ip, _ in results]
+
+    return full, best
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+经可用代理多点测速
+
+s5/generate_proxy_list.py 产出的 alive.json 带有 clean_location 地理/运营商文本，
+按 电信 / 联通 / 移动 关键字把代理归到对应线路，作为该线路的测速节点:
+
+  1. 每个候选 IP × 每个节点，经代理建立到 ip:port 的隧道，记录建连耗时和 TLS 握手耗时
+  2. 汇总为 IP × 节点 的延迟矩阵
+  3. 每条运营商线路只用该运营商的节点，按中位延迟排序，半数以上节点失败的 IP 剔除
+     （全部候选都失败的节点视为代理失效，不参与计数）
+
+默认 线路、没有节点的线路以及存活 IP 少于 min_survivors 的线路都保留上游结果。
+
+经代理测得的延迟包含 本机→代理 这一段，同一节点内各 IP 的排序不受影响。
+仅处理 IPv4 线路，IPv6 保持上游结果。
+"""
+
+import json
+import ssl
+import statistics
+import time
+import concurrent.futures
+
+import socks
+
+PROXY_TYPES = {
+    'socks5': socks.SOCKS5,
+    'socks5h': socks.SOCKS5,
+    'socks4': socks.SOCKS4,
+    'socks4a': socks.SOCKS4,
+    'http': socks.HTTP,
+    'https': socks.HTTP,
+}
+
+CARRIER_KEYWORDS = {
+    '电信': ('电信', 'China Telecom', 'CHINANET'),
+    '联通': ('联通', 'China Unicom'),
+    '移动': ('移动', 'China Mobile', 'CMNET'),
+}
+
+IPV4_LINES = ["默认", "电信", "联通", "移动"]
+
+
+def carrier_of(location):
+    """从地理信息文本识别运营商线路，识别不到返回 None"""
+    for line, keywords in CARRIER_KEYWORDS.items():
+        if any(kw.lower() in location.lower() for kw in keywords):
+            return line
+    return None
+
+
+def load_vantages(path):
+    """读取 alive.json，为每个代理补充 line（运营商）和 label 字段"""
+    with open(path, encoding='utf-8') as f:
+        proxies = json.load(f)
+
+    vantages = []
+    for p in proxies:
+        if p.get('protocol') not in PROXY_TYPES:
+            continue
+        p['line'] = carrier_of(p.get('location', ''))
+        p['label'] = f"{p['protocol']}://{p['ip']}:{p['port']}"
+        vantages.append(p)
+    return vantages
+
+
+def probe_via_proxy(vantage, ip, port=443, timeout=5, sni="cloudflare.com"):
+    """
+    经代理测 ip:port，返回 (建连秒数, TLS 握手秒数)，失败返回 None
+
+    sni 为空时只测隧道建连，TLS 握手耗时记为 0
+    """
+    sock = socks.socksocket()
+    sock.set_proxy(PROXY_TYPES[vantage['protocol']], vantage['ip'], int(vantage['port']))
+    sock.settimeout(timeout)
+    try:
+        start = time.perf_counter()
+        sock.connect((ip, port))
+        connected = time.perf_counter()
+        if not sni:
+            return connected - start, 0.0
+        # 只关心握手耗时，不校验证书
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        with context.wrap_socket(sock, server_hostname=sni):
+            return connected - start, time.perf_counter() - connected
+    except (OSError, socks.ProxyError):
+        return None
+    finally:
+        sock.close()
+
+
+def build_latency_matrix(ips, vantages, probe, workers=32):
+    """并发测所有 IP × 节点，返回 {ip: {节点label: (建连, TLS) 或 None}}"""
+    matrix = {ip: {} for ip in ips}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(probe, v, ip): (ip, v['label'])
+            for ip in ips for v in vantages
+        }
+        for future in concurrent.futures.as_completed(futures):
+            ip, label = futures[future]
+            matrix[ip][label] = future.result()
+    return matrix
+
+
+def rank_lines(matrix, vantages, keep):
+    """按运营商线路节点的中位延迟排序，返回 {线路: [ip, ...]}，只包含有节点的运营商线路"""
+    labels_by_line = {}
+    for v in vantages:
+        # 对所有候选都失败的节点是代理本身不可用，不代表 IP 不可用
+        if v['line'] and any(row.get(v['label']) for row in matrix.values()):
+            labels_by_line.setdefault(v['line'], []).append(v['label'])
+
+    ranked = {}
+    for line, labels in labels_by_line.items():
+        scores = []
+        for ip, row in matrix.items():
+            totals = [sum(row[l]) for l in labels if row.get(l)]
+            if len(totals) * 2 < len(labels):
+                continue
+            scores.append((statistics.median(totals), ip))
+        ranked[line] = [ip for _, ip in sorted(scores)[:keep]]
+    return ranked
+
+
+def vantage_best(best, vantages, probe=None, keep=50, min_survivors=5, workers=32):
+    """
+    用运营商节点的延迟矩阵重新挑选 电信 / 联通 / 移动 线路的 IP
+
+    候选为 best 中四条 IPv4 线路的并集，只使用带运营商标记的节点。
+    返回 (完整数据, 最优IP)，最优IP 只包含实际被重新挑选的线路
+    """
+    if probe is None:
+        probe = probe_via_proxy
+
+    tagged = [v for v in vantages if v['line']]
+    ips = list(dict.fromkeys(
+        ip for line in IPV4_LINES for ip in best.get(line, []) if ":" not in ip))
+    if not ips:
+        return {}, {}
+    if not tagged:
+        print(f"多点测速: {len(vantages)} 个节点中没有带运营商标记的节点，保留上游结果")
+        return {}, {}
+
+    print(f"多点测速: {len(ips)} 个候选 IP × {len(tagged)} 个运营商节点"
+          f"（忽略 {len(vantages) - len(tagged)} 个无运营商标记的节点）")
+    start = time.time()
+    matrix = build_latency_matrix(ips, tagged, probe, workers=workers)
+    ranked = rank_lines(matrix, tagged, keep)
+    chosen_lines = {}
+    for line, chosen in ranked.items():
+        if len(chosen) < min(min_survivors, len(ips)):
+            print(f"  {line}: 仅 {len(chosen)} 个 IP 通过测速，少于 {min_survivors} 个，保留上游结果")
+            continue
+        print(f"  {line}: 选出 {len(chosen)} 个 IP")
+        chosen_lines[line] = chosen
+    print(f"多点测速完成，耗时 {time.time() - start:.1f}s")
+
+    full = {"节点测速": {
+        ip: {label: (f"{sum(r) * 1000:.2f}ms" if r else None) for label, r in row.items()}
+        for ip, row in matrix.items()
+    }}
+    return full, chosen_lines
@@ -7,7 +7,12 @@ import time
 from datetime import datetime, timezone, timedelta
 import re
 import os
+import json
 import concurrent.futures
+from collections import deque
+
+# 共用模块位于仓库根目录，需在根目录以 python -m s5.generate_proxy_list 运行
+from telegram_notifier import TelegramNotifier
 
 class ProxyListScraper:
     def __init__(self):
@@ -18,11 +23,18 @@ class ProxyListScraper:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
             'Referer': self.base_url
         }
-        self.tg_bot_token = os.environ.get('TG_BOT_TOKEN', '')
-        self.tg_user_id = os.environ.get('TG_USER_ID', '')
+        self.notifier = TelegramNotifier.from_env()
         self.cn_tz = timezone(timedelta(hours=8))
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        # 分组检测: location(按地理+运营商) / subnet(按 /24) / none(不分组)
+        self.group_by = os.environ.get('PROXY_GROUP_BY', 'location').lower()
+        # 代表失败后同组其余代理的处理: defer(立即短超时检测) / test(照常检测) / skip(跳过，会丢弃可用代理)
+        self.sibling_rule = os.environ.get('PROXY_SIBLING_RULE', 'defer').lower()
+        self.check_url = 'http://httpbin.org/ip'
+        self.check_timeout = 10
+        self.deferred_timeout = 3
+        self.check_stats = {}
 
     def get_cn_time(self):
         return datetime.now(self.cn_tz)
@@ -328,7 +340,7 @@ class ProxyListScraper:
 
         try:
             response = requests.get(
-                'http://httpbin.org/ip',
+                self.check_url,
                 proxies=proxies,
                 timeout=timeout,
                 headers={'User-Agent': 'Mozilla/5.0'}
@@ -337,37 +349,163 @@ class ProxyListScraper:
         except Exception:
             return False
 
+    def group_key(self, proxy_info):
+        """
+        计算代理的分组键
+
+          subnet   → 协议 + IPv4 /24 前缀，如 https 13.37.225
+          location → 协议 + clean_location 生成的地理/运营商文本
+          none     → 每个代理单独成组
+        """
+        protocol = proxy_info['protocol']
+        if self.group_by == 'subnet':
+            return (protocol, proxy_info['ip'].rsplit('.', 1)[0])
+        if self.group_by == 'location' and proxy_info.get('location', '未知') != '未知':
+            return (protocol, proxy_info['location'])
+        return (protocol, proxy_info['ip'], proxy_info['port'])
+
+    def group_proxies(self, proxy_list):
+        """按 group_key 分组，保持原顺序（组内第一个作为代表）"""
+        groups = {}
+        for proxy_info in proxy_list:
+            groups.setdefault(self.group_key(proxy_info), []).append(proxy_info)
+        return groups
+
     def check_all_proxies(self, proxy_list, max_workers=20):
-        """并发检测所有代理可用性"""
+        """
+        并发检测所有代理可用性（按地理/网段分组调度）
+
+        每组先检测一个代表，线程占满时同组其余代理等代表结果:
+          代表可用 → 立即检测同组其余代理
+          代表不可用 → 按 sibling_rule 立即短超时检测 / 照常检测 / 跳过
+
+        线程有空闲时不等代表结果，提前检测同组其余代理。此时还没结果的多是失效组，
+        除 test 规则外提前检测使用短超时；短超时失败而代表可用的，再按正常超时复检
+        """
         if not proxy_list:
             print("没有代理需要检测")
             return []
 
-        # 入库时已过滤掩码IP，直接全量检测
+        # 入库时已过滤掩码IP
+        groups = self.group_proxies(proxy_list)
         print(f"\n{'='*50}")
-        print(f"开始检测 {len(proxy_list)} 个代理的可用性...")
+        print(f"开始检测 {len(proxy_list)} 个代理的可用性"
+              f"（{len(groups)} 组，分组={self.group_by}，规则={self.sibling_rule}）...")
         print(f"{'='*50}")
 
         alive_proxies = []
+        stats = {
+            'total': len(proxy_list),
+            'groups': len(groups),
+            'representatives': 0,
+            'early': 0,
+            'rechecked': 0,
+            'siblings_checked': 0,
+            'deferred': 0,
+            'skipped': 0,
+            'checks': 0,
+        }
+        started = time.time()
+        early_timeout = self.check_timeout if self.sibling_rule == 'test' else self.deferred_timeout
 
-        def _check_one(proxy_info):
+        def _check_one(proxy_info, timeout):
             start   = time.time()
-            ok      = self.check_proxy_availability(proxy_info, timeout=10)
+            ok      = self.check_proxy_availability(proxy_info, timeout=timeout)
             elapsed = time.time() - start
             label   = f"{proxy_info['protocol']}://{proxy_info['ip']}:{proxy_info['port']}"
             return proxy_info, ok, elapsed, label
 
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(_check_one, p): p for p in proxy_list}
-            for future in concurrent.futures.as_completed(futures):
-                proxy_info, ok, elapsed, label = future.result()
-                if ok:
-                    print(f"  ✅ {label} ({elapsed:.1f}s)")
-                    alive_proxies.append(proxy_info)
-                else:
-                    print(f"  ❌ {label} ({elapsed:.1f}s)")
+            pending = {}
+            # 待提交的检测: (组键, 代理, 超时, 类型)，类型为 rep / early / sibling
+            ready   = deque((key, members[0], self.check_timeout, 'rep') for key, members in groups.items())
+            # 代表结果未出、尚未开始检测的同组代理
+            waiting = {key: members[1:] for key, members in groups.items() if len(members) > 1}
+            # 代表结果: 组键 → 是否可用；以及代表结果出来前短超时失败的提前检测
+            resolved     = {}
+            early_failed = {}
+
+            def _recheck(key, proxy_info):
+                ready.append((key, proxy_info, self.check_timeout, 'sibling'))
+                stats['rechecked'] += 1
+
+            def _fill():
+                while len(pending) < max_workers:
+                    if ready:
+                        key, proxy_info, timeout, kind = ready.popleft()
+                        if kind == 'rep':
+                            stats['representatives'] += 1
+                    elif waiting:
+                        key = next(iter(waiting))
+                        proxy_info = waiting[key].pop(0)
+                        if not waiting[key]:
+                            del waiting[key]
+                        timeout, kind = early_timeout, 'early'
+                        stats['early'] += 1
+                    else:
+                        return
+                    pending[executor.submit(_check_one, proxy_info, timeout)] = (key, kind)
+
+            _fill()
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    key, kind = pending.pop(future)
+                    proxy_info, ok, elapsed, label = future.result()
+                    stats['checks'] += 1
+                    if ok:
+                        print(f"  ✅ {label} ({elapsed:.1f}s)")
+                        alive_proxies.append(proxy_info)
+                    else:
+                        print(f"  ❌ {label} ({elapsed:.1f}s)")
+
+                    if kind == 'early':
+                        if ok or early_timeout >= self.check_timeout:
+                            continue
+                        if key not in resolved:
+                            early_failed.setdefault(key, []).append(proxy_info)
+                        elif resolved[key]:
+                            _recheck(key, proxy_info)
+                        continue
+                    if kind != 'rep':
+                        continue
+
+                    resolved[key] = ok
+                    if ok:
+                        for sibling in early_failed.pop(key, []):
+                            _recheck(key, sibling)
+                    else:
+                        early_failed.pop(key, None)
+
+                    siblings = waiting.pop(key, [])
+                    if not siblings:
+                        continue
+                    if ok or self.sibling_rule == 'test':
+                        ready.extend((key, sibling, self.check_timeout, 'sibling') for sibling in siblings)
+                        stats['siblings_checked'] += len(siblings)
+                    elif self.sibling_rule == 'defer':
+                        # 短超时检测排在队首，不等其余检测完成
+                        ready.extendleft((key, sibling, self.deferred_timeout, 'sibling')
+                                         for sibling in reversed(siblings))
+                        stats['deferred'] += len(siblings)
+                    else:
+                        stats['skipped'] += len(siblings)
+                        for sibling in siblings:
+                            print(f"  ⏭️  {sibling['protocol']}://{sibling['ip']}:{sibling['port']} "
+                                  f"(同组代表 {label} 不可用，跳过)")
+                _fill()
+
+        stats['elapsed'] = round(time.time() - started, 2)
+        stats['saved_checks'] = stats['total'] - stats['checks']
+        self.check_stats = stats
 
         print(f"\n检测完成: {len(alive_proxies)}/{len(proxy_list)} 个代理可用")
+        print(f"  分组: {stats['groups']} 组 | 代表检测: {stats['representatives']} | "
+              f"提前检测: {stats['early']} | 复检: {stats['rechecked']} | "
+              f"同组检测: {stats['siblings_checked']} | 短超时检测: {stats['deferred']} | "
+              f"跳过: {stats['skipped']}")
+        print(f"  共检测 {stats['checks']} 次（不分组需 {stats['total']} 次），耗时 {stats['elapsed']}s")
         return alive_proxies
 
     def save_alive_proxies(self, alive_proxies, filename='alive.txt'):
@@ -393,6 +531,26 @@ class ProxyListScraper:
             traceback.print_exc()
             return False
 
+    def save_alive_details(self, alive_proxies, filename='alive.json'):
+        """保存可用代理详情到 alive.json（含地理/运营商信息，供多点测速使用）"""
+        if not alive_proxies:
+            print("没有可用的代理，跳过保存")
+            return False
+
+        try:
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            filepath   = os.path.join(script_dir, filename)
+
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(alive_proxies, f, ensure_ascii=False, indent=4)
+
+            print(f"✅ 可用代理详情已保存到 {filepath}")
+            return True
+
+        except Exception as e:
+            print(f"❌ 保存文件错误: {e}")
+            return False
+
     def save_to_file(self, proxies_str, filename='proxy.txt'):
         """保存全部代理到 proxy.txt（带时间戳和地理信息）"""
         try:
@@ -414,8 +572,13 @@ class ProxyListScraper:
             return False
 
     def send_telegram_notification(self, alive_proxies):
-        """发送 Telegram 通知（最多显示前10个）"""
-        if not self.tg_bot_token or not self.tg_user_id:
+        """
+        发送 Telegram 通知（最多显示前10个）
+
+        消息交给后台线程发送，返回 True 只表示已入队，不代表已送达；
+        送达结果在进程退出前打印
+        """
+        if not self.notifier:
             print("未配置TG_BOT_TOKEN或TG_USER_ID，跳过Telegram通知")
             return False
 
@@ -423,41 +586,20 @@ class ProxyListScraper:
             print("没有可用代理，跳过Telegram通知")
             return True
 
-        try:
-            current_time = self.get_cn_time().strftime('%m-%d %H:%M')
-            total   = len(alive_proxies)
-            message = f"🌐 <b>可用代理</b> | {current_time} | 共{total}个\n\n"
-
-            for proxy in alive_proxies[:10]:
-                proxy_url = f"{proxy['protocol']}://{proxy['ip']}:{proxy['port']}"
-                message  += f"<code>{proxy_url}</code>\n"
-                message  += f"└ {proxy['location']}\n"
-
-            if total > 10:
-                message += f"\n... 等共 {total} 个代理"
-
-            url     = f"https://api.telegram.org/bot{self.tg_bot_token}/sendMessage"
-            payload = {
-                'chat_id': self.tg_user_id,
-                'text': message,
-                'parse_mode': 'HTML',
-                'disable_web_page_preview': True
-            }
+        current_time = self.get_cn_time().strftime('%m-%d %H:%M')
+        total   = len(alive_proxies)
+        message = f"🌐 <b>可用代理</b> | {current_time} | 共{total}个\n\n"
 
-            resp = requests.post(url, json=payload, timeout=30)
-            resp.raise_for_status()
-            result = resp.json()
+        for proxy in alive_proxies[:10]:
+            proxy_url = f"{proxy['protocol']}://{proxy['ip']}:{proxy['port']}"
+            message  += f"<code>{proxy_url}</code>\n"
+            message  += f"└ {proxy['location']}\n"
 
-            if result.get('ok'):
-                print(f"✅ Telegram通知发送成功，共 {total} 个可用代理")
-                return True
-            else:
-                print(f"❌ Telegram通知发送失败: {result}")
-                return False
+        if total > 10:
+            message += f"\n... 等共 {total} 个代理"
 
-        except Exception as e:
-            print(f"❌ Telegram通知错误: {e}")
-            return False
+        print(f"📨 Telegram通知已加入发送队列，共 {total} 个可用代理")
+        return self.notifier.send(message)
 
 
 def main():
@@ -468,6 +610,7 @@ def main():
         scraper.save_to_file(proxies_str)
         alive_proxies = scraper.check_all_proxies(all_proxies)
         scraper.save_alive_proxies(alive_proxies, filename='alive.txt')
+        scraper.save_alive_details(alive_proxies, filename='alive.json')
         scraper.send_telegram_notification(alive_proxies)
         print("\n✅ 代理列表处理完成！")
     else:
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram 通知发送器（cloudflare_dns_updater.py 与 s5/generate_proxy_list.py 共用）
+
+  - 复用 keep-alive 连接池，不再每条消息新建连接
+  - send() 只入队，由后台线程发送，主流程不等待网络
+  - 同一 chat 每 min_interval 秒最多发一条，429 时按 retry_after 重试一次
+  - coalesce_window 秒内同一 chat 的多条消息合并为一条（不超过 4096 字符）
+  - 进程退出时最多等待 flush_timeout 秒把队列发完，并打印送达耗时
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TELEGRAM_API = "https://api.telegram.org"
+MAX_MESSAGE_LENGTH = 4096
+
+# 进程内只注册一次 atexit，退出时关闭所有仍在使用的发送器
+_live_notifiers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_all():
+    for notifier in list(_live_notifiers):
+        notifier.close()
+
+
+class TelegramNotifier:
+    def __init__(self, bot_token, chat_id, api_base=None, timeout=10, min_interval=1.0,
+                 coalesce_window=0.5, flush_timeout=None):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.api_base = (api_base or os.environ.get("TG_API_BASE") or TELEGRAM_API).rstrip("/")
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.coalesce_window = coalesce_window
+        # 退出时最多等待的秒数，默认与单次请求超时相同，不超过原先同步发送的阻塞时间
+        if flush_timeout is None:
+            flush_timeout = float(os.environ.get("TG_FLUSH_TIMEOUT") or timeout)
+        self.flush_timeout = flush_timeout
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self.metrics = {"queued": 0, "sent": 0, "failed": 0, "coalesced": 0, "latency_ms": []}
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._last_sent = {}
+        self._worker = None
+        self._closed = False
+        _live_notifiers.add(self)
+
+    @classmethod
+    def from_env(cls, token_var="TG_BOT_TOKEN", chat_var="TG_USER_ID", **kwargs):
+        """环境变量未配置时返回 None"""
+        bot_token = os.environ.get(token_var, "")
+        chat_id = os.environ.get(chat_var, "")
+        if not bot_token or not chat_id:
+            return None
+        return cls(bot_token, chat_id, **kwargs)
+
+    def send(self, text, chat_id=None, parse_mode="HTML", disable_web_page_preview=True):
+        """入队一条消息，立即返回；True 只表示已入队，送达结果见 metrics"""
+        if self._closed:
+            return False
+        with self._cond:
+            self._pending += 1
+            self.metrics["queued"] += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+                self._worker.start()
+        options = (chat_id or self.chat_id, parse_mode, disable_web_page_preview)
+        self._queue.put((options, text, time.monotonic()))
+        return True
+
+    def flush(self, timeout=None):
+        """等待队列发送完毕，最多 timeout 秒，全部处理完返回 True"""
+        timeout = self.flush_timeout if timeout is None else timeout
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self, timeout=None):
+        """限时发完剩余消息并停止后台线程（未关闭的发送器在进程退出时自动调用）"""
+        if self._closed:
+            return
+        self._closed = True
+        _live_notifiers.discard(self)
+        if self._worker is None:
+            self.session.close()
+            return
+        timeout = self.flush_timeout if timeout is None else timeout
+        if self.flush(timeout):
+            self.session.close()
+        else:
+            print(f"⚠️ Telegram 通知未在 {timeout}s 内发完，剩余 {self._pending} 条放弃")
+        self._queue.put(None)
+        latencies = self.metrics["latency_ms"]
+        if latencies:
+            print(f"📨 Telegram: 发送 {self.metrics['sent']} 条（合并 {self.metrics['coalesced']} 条，"
+                  f"失败 {self.metrics['failed']} 条），送达耗时 "
+                  f"平均 {sum(latencies) / len(latencies):.0f}ms / 最大 {max(latencies):.0f}ms")
+
+    # ── 后台线程 ─────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.coalesce_window
+            while not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            # 关闭阶段不再等待合并窗口，直接取走已入队的消息
+            while self._closed and not stop:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            for options, texts, enqueued in self._coalesce(batch):
+                self._deliver(options, "\n\n".join(texts), enqueued)
+
+            with self._cond:
+                self._pending -= len(batch)
+                self._cond.notify_all()
+            if stop:
+                return
+
+    def _coalesce(self, batch):
+        """同一 chat、同一参数的消息按顺序合并，单条不超过 MAX_MESSAGE_LENGTH"""
+        merged = []
+        for options, text, enqueued in batch:
+            last = merged[-1] if merged else None
+            if (last and last[0] == options
+                    and sum(len(t) + 2 for t in last[1]) + len(text) <= MAX_MESSAGE_LENGTH):
+                last[1].append(text)
+                self.metrics["coalesced"] += 1
+            else:
+                merged.append((options, [text], enqueued))
+        return merged
+
+    def _deliver(self, options, text, enqueued):
+        chat_id, parse_mode, disable_preview = options
+        wait = self._last_sent.get(chat_id, 0) + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        url = f"{self.api_base}/bot{self.bot_token}/sendMessage"
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "disable_web_page_preview": disable_preview,
+        }
+        try:
+            for attempt in range(2):
+                resp = self.session.post(url, json=payload, timeout=self.timeout)
+                self._last_sent[chat_id] = time.monotonic()
+                if resp.status_code == 429 and attempt == 0:
+                    retry_after = resp.json().get("parameters", {}).get("retry_after", 1)
+                    time.sleep(min(retry_after, self.timeout))
+                    continue
+                break
+
+            if resp.status_code == 200 and resp.json().get("ok"):
+                self.metrics["sent"] += 1
+                self.metrics["latency_ms"].append((time.monotonic() - enqueued) * 1000)
+                print("✅ Telegram 通知发送成功")
+            else:
+                self.metrics["failed"] += 1
+                print(f"❌ Telegram 通知发送失败: {resp.text}")
+        except Exception as e:
+            self.metrics["failed"] += 1
+            print(f"❌ Telegram 通知异常: {e}")